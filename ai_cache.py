@@ -0,0 +1,44 @@
+import hashlib
+import os
+from contextlib import suppress
+from typing import Any, Dict, Optional
+
+import orjson
+
+CACHE_DIR = os.environ.get("AI_CACHE_DIR", os.path.join(os.path.dirname(__file__), "cache"))
+
+
+def cache_key(*parts: str) -> str:
+    """Content-addressed key over the inputs that determine an AI response."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_cache_path(key), "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+def put(key: str, value: Dict[str, Any]) -> None:
+    # fail open like get(): a full disk or unwritable cache dir must not
+    # fail the job whose AI call already succeeded
+    path = _cache_path(key)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(value))
+        os.replace(tmp_path, path)
+    except OSError:
+        with suppress(OSError):
+            os.remove(tmp_path)
@@ -1,16 +1,212 @@
+import asyncio
+import contextlib
 import os
 import sys
 import httpx
+import msgspec
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 sys.path.append(os.path.dirname(__file__))
-from slack_bot.db import get_db, get_issue_events
+import ai_cache
+from slack_bot.db import AsyncSessionLocal, async_session_scope, get_db, get_issue_events_with_body
 from shared.models import AIJob, Event, Issue
 
 AI_API_URL = os.environ.get("AI_API_URL", "https://ai.hackclub.com/proxy/v1/chat/completions")
 AI_API_KEY = os.environ.get("AI_API_KEY")
 AI_MODEL = os.environ.get("AI_MODEL", "openai/gpt-4")
+AI_WRITE_BATCH_SIZE = int(os.environ.get("AI_WRITE_BATCH_SIZE", "50"))
+AI_WRITE_BATCH_DELAY_MS = int(os.environ.get("AI_WRITE_BATCH_DELAY_MS", "10"))
+AI_MAX_CONCURRENCY = int(os.environ.get("AI_MAX_CONCURRENCY", "16"))
+AI_MAX_THREAD_CHARS = int(os.environ.get("AI_MAX_THREAD_CHARS", "48000"))
+AI_RETRY_ATTEMPTS = int(os.environ.get("AI_RETRY_ATTEMPTS", "5"))
+
+
+def _is_retryable_error(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.HTTPError)
+
+
+def _retry_wait(retry_state):
+    """Honor Retry-After on 429s, otherwise exponential backoff with jitter."""
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+        retry_after = exc.response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return wait_exponential_jitter(initial=1, max=30)(retry_state)
+
+_SYSTEM_PROMPT = """You are an AI assistant that analyzes support conversations.
+Your job is to:
+1. Summarize the main issue or request
+2. Identify key discussion points
+3. Extract any action items or promises made
+4. Determine the current status and next steps
+5. Assess the urgency and sentiment
+
+Respond in JSON format with the following structure:
+{
+    "summary": "Brief overview of the issue",
+    "main_issue": "The core problem or request",
+    "key_points": ["point 1", "point 2", ...],
+    "action_items": ["action 1", "action 2", ...],
+    "promises": ["promise 1", "promise 2", ...],
+    "next_steps": "What should happen next",
+    "urgency": "low|medium|high",
+    "sentiment": "positive|neutral|negative",
+    "suggested_tags": ["tag1", "tag2", ...]
+}"""
+
+
+def _truncate_parts(parts: List[str], max_chars: int) -> List[str]:
+    """Keep the most recent messages that fit within the character budget."""
+    total = 0
+    kept = []
+    for part in reversed(parts):
+        total += len(part)
+        if total > max_chars:
+            break
+        kept.append(part)
+    if not kept and parts:
+        kept.append(parts[-1][:max_chars])
+    kept.reverse()
+    return kept
+
+class _AIMessage(msgspec.Struct):
+    content: str = ""
+
+
+class _AIChoice(msgspec.Struct):
+    message: _AIMessage = msgspec.field(default_factory=_AIMessage)
+
+
+class _AIResponse(msgspec.Struct):
+    choices: List[_AIChoice] = msgspec.field(default_factory=list)
+
+
+# Typed decoder that materializes only choices[].message.content and skips
+# the rest of the completion payload (usage stats, logprobs, ...).
+_ai_response_decoder = msgspec.json.Decoder(_AIResponse)
+
+
+class Summary(msgspec.Struct):
+    summary: str = ""
+    main_issue: str = ""
+    key_points: List[str] = msgspec.field(default_factory=list)
+    action_items: List[str] = msgspec.field(default_factory=list)
+    promises: List[str] = msgspec.field(default_factory=list)
+    next_steps: str = ""
+    urgency: str = "low"
+    sentiment: str = "neutral"
+    suggested_tags: List[str] = msgspec.field(default_factory=list)
+
+
+# decodes + validates the model's JSON answer in one pass
+_summary_decoder = msgspec.json.Decoder(Summary)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Shared AsyncClient so concurrent AI calls reuse keepalive connections."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            transport=httpx.AsyncHTTPTransport(retries=2)
+        )
+    return _http_client
+
+
+class JobWriteBatcher:
+    """
+    Coalesces non-terminal AIJob status updates into bulk UPDATEs.
+
+    Transitions are enqueued and flushed in one bulk_update_mappings call
+    when either batch_size rows have accumulated or batch_delay_ms has
+    elapsed, instead of one commit per transition. Each flush opens its
+    own short-lived session, so no connection is pinned between flushes.
+    """
+
+    def __init__(self, batch_size: int = AI_WRITE_BATCH_SIZE,
+                 batch_delay_ms: int = AI_WRITE_BATCH_DELAY_MS):
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay_ms / 1000.0
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._queued: Dict[Any, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def enqueue(self, mapping: Dict[str, Any]):
+        job_id = mapping["id"]
+        if job_id in self._queued:
+            self._queued[job_id].update(mapping)
+        else:
+            self._queued[job_id] = dict(mapping)
+            await self.queue.put(job_id)
+
+    def discard(self, job_id):
+        """Drop a queued transition, e.g. when a terminal write supersedes it."""
+        self._queued.pop(job_id, None)
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_ids = [await self.queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(job_ids) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    job_ids.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            rows = [self._queued.pop(job_id) for job_id in job_ids if job_id in self._queued]
+            try:
+                # these are non-terminal writes; on a transient DB error drop
+                # the batch rather than killing the loop — _finish_job's
+                # terminal write is the authoritative one
+                await self._flush(rows)
+            except Exception as e:
+                print(f"Error flushing AI job status batch: {e}")
+            finally:
+                for _ in job_ids:
+                    self.queue.task_done()
+
+    async def _flush(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        jobs = AIJob.__table__
+        async with async_session_scope() as db:
+            # one Core executemany over the batch; the status guard keeps a
+            # late "processing" write (popped before discard() could drop it)
+            # from clobbering a terminal state already written by _finish_job
+            await db.execute(
+                update(jobs)
+                .where(jobs.c.id == bindparam("b_id"), jobs.c.status == "pending")
+                .values(status=bindparam("b_status")),
+                [{"b_id": row["id"], "b_status": row["status"]} for row in rows]
+            )
+
+    async def close(self):
+        if self._task:
+            await self.queue.join()
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
 
 
 def create_ai_job(event_id: str, job_type: str = "full_extraction") -> AIJob:
@@ -30,19 +226,27 @@ def create_ai_job(event_id: str, job_type: str = "full_extraction") -> AIJob:
         db.close()
 
 
-def get_pending_ai_jobs() -> List[AIJob]:
-    db = get_db()
-    try:
-        jobs = db.query(AIJob).filter(
+async def get_pending_ai_jobs(db: AsyncSession) -> List[AIJob]:
+    result = await db.execute(
+        select(AIJob).options(
+            joinedload(AIJob.event).joinedload(Event.issue).selectinload(
+                # only live events with a body are ever summarized, so don't
+                # transfer the rest
+                Issue.events.and_(
+                    Event.deleted_at.is_(None),
+                    Event.body.isnot(None),
+                    Event.body != ""
+                )
+            )
+        ).where(
             AIJob.status == "pending",
             AIJob.deleted_at.is_(None)
-        ).all()
-        return jobs
-    finally:
-        db.close()
+        )
+    )
+    return list(result.scalars().unique().all())
 
 
-async def call_ai_api(messages: List[Dict[str, str]], system_prompt: Optional[str] = None) -> Dict[str, Any]:
+async def call_ai_api(messages: List[Dict[str, str]], system_prompt: Optional[str] = None) -> str:
     if not AI_API_KEY:
         raise ValueError("AI_API_KEY environment variable is not set")
     
@@ -55,144 +259,160 @@ async def call_ai_api(messages: List[Dict[str, str]], system_prompt: Optional[st
         })
     
     formatted_messages.extend(messages)
-    
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            AI_API_URL,
-            headers={
-                "Authorization": f"Bearer {AI_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": AI_MODEL,
-                "messages": formatted_messages,
-                "temperature": 0.7
-            }
-        )
-        response.raise_for_status()
-        return response.json()
 
+    key = ai_cache.cache_key(
+        AI_MODEL,
+        system_prompt or "",
+        "\n".join(m["content"] for m in messages)
+    )
+    cached = ai_cache.get(key)
+    if cached is not None:
+        return cached["content"]
+
+    client = _get_http_client()
+    content = ""
+    async for attempt in AsyncRetrying(
+        retry=retry_if_exception(_is_retryable_error),
+        wait=_retry_wait,
+        stop=stop_after_attempt(AI_RETRY_ATTEMPTS),
+        reraise=True
+    ):
+        with attempt:
+            response = await client.post(
+                AI_API_URL,
+                headers={
+                    "Authorization": f"Bearer {AI_API_KEY}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": AI_MODEL,
+                    "messages": formatted_messages,
+                    "temperature": 0.7,
+                    "response_format": {"type": "json_object"}
+                }
+            )
+            response.raise_for_status()
+            content = _ai_response_decoder.decode(response.content).choices[0].message.content
+    ai_cache.put(key, {"content": content})
+    return content
+
+
+async def summarize_thread(issue_id: str, events: Optional[List[Event]] = None) -> Dict[str, Any]:
+    if events is None:
+        # sync helper for non-async callers (the Slack bot); keep it off the loop
+        events = await asyncio.to_thread(get_issue_events_with_body, issue_id)
 
-async def summarize_thread(issue_id: str) -> Dict[str, Any]:
-    events = get_issue_events(issue_id)
-    
     if not events:
         return {"error": "No messages found for this issue"}
     
-    thread_text = "\n\n".join([
+    parts = [
         f"[{event.author}]: {event.body}"
         for event in events
         if event.body
-    ])
-    
-    system_prompt = """You are an AI assistant that analyzes support conversations. 
-Your job is to:
-1. Summarize the main issue or request
-2. Identify key discussion points
-3. Extract any action items or promises made
-4. Determine the current status and next steps
-5. Assess the urgency and sentiment
+    ]
+    if sum(map(len, parts)) > AI_MAX_THREAD_CHARS:
+        parts = _truncate_parts(parts, AI_MAX_THREAD_CHARS)
+    thread_text = "\n\n".join(parts)
 
-Respond in JSON format with the following structure:
-{
-    "summary": "Brief overview of the issue",
-    "main_issue": "The core problem or request",
-    "key_points": ["point 1", "point 2", ...],
-    "action_items": ["action 1", "action 2", ...],
-    "promises": ["promise 1", "promise 2", ...],
-    "next_steps": "What should happen next",
-    "urgency": "low|medium|high",
-    "sentiment": "positive|neutral|negative",
-    "suggested_tags": ["tag1", "tag2", ...]
-}"""
-    
     messages = [
         {
             "role": "user",
             "content": f"Analyze this support thread:\n\n{thread_text}"
         }
     ]
-    
+
     try:
-        response = await call_ai_api(messages, system_prompt)
-        ai_content = response["choices"][0]["message"]["content"]
-        
-        import json
-        try:
-            summary_data = json.loads(ai_content)
-        except json.JSONDecodeError:
-            summary_data = {
-                "summary": ai_content,
-                "raw_response": ai_content
-            }
-        
-        return summary_data
-    
+        ai_content = await call_ai_api(messages, _SYSTEM_PROMPT)
+        # response_format above guarantees JSON, so decode strictly into the
+        # typed schema instead of falling back to wrapping raw text
+        return msgspec.to_builtins(_summary_decoder.decode(ai_content))
+
     except Exception as e:
         return {"error": str(e)}
 
 
-async def process_ai_job(job: AIJob) -> Dict[str, Any]:
-    db = get_db()
+async def _mark_processing(job_id) -> None:
+    async with async_session_scope() as db:
+        await db.execute(update(AIJob).where(AIJob.id == job_id).values(status="processing"))
+
+
+async def _finish_job(job: AIJob, batcher: Optional[JobWriteBatcher], status: str,
+                      output: Dict[str, Any], event_id=None) -> Dict[str, Any]:
+    """Write the terminal state for a job in one short transaction."""
+    if batcher:
+        batcher.discard(job.id)
+
+    values: Dict[str, Any] = {"status": status, "output": output}
+    if status == "completed":
+        # filled server-side in the UPDATE; keeps the tz-aware column
+        # consistent and skips a Python datetime per job
+        values["completed_at"] = func.now()
+
+    async with async_session_scope() as db:
+        await db.execute(update(AIJob).where(AIJob.id == job.id).values(**values))
+        if event_id is not None:
+            await db.execute(update(Event).where(Event.id == event_id).values(ai_metadata=output))
+
+    job.status = status
+    job.output = output
+    return output
+
+
+async def process_ai_job(job: AIJob,
+                         batcher: Optional[JobWriteBatcher] = None) -> Dict[str, Any]:
+    # The job arrives with event/issue/events preloaded (get_pending_ai_jobs),
+    # so no database connection is held while the AI call is in flight —
+    # only short transactions bracket it.
     try:
         job.status = "processing"
-        db.add(job)
-        db.commit()
-        
-        event = db.query(Event).filter(Event.id == job.event_id).first()
+        if batcher:
+            await batcher.enqueue({"id": job.id, "status": "processing"})
+        else:
+            await _mark_processing(job.id)
+
+        event = job.event
         if not event:
-            job.status = "failed"
-            job.output = {"error": "Event not found"}
-            db.add(job)
-            db.commit()
-            return job.output
-        
-        issue = db.query(Issue).filter(Issue.id == event.issue_id).first()
+            return await _finish_job(job, batcher, "failed", {"error": "Event not found"})
+
+        issue = event.issue
         if not issue:
-            job.status = "failed"
-            job.output = {"error": "Issue not found"}
-            db.add(job)
-            db.commit()
-            return job.output
-        
+            return await _finish_job(job, batcher, "failed", {"error": "Issue not found"})
+
         if job.job_type == "full_extraction":
-            summary = await summarize_thread(str(issue.id))
-            
-            job.status = "completed"
-            job.output = summary
-            job.completed_at = datetime.utcnow()
-            
-            event.ai_metadata = summary
-            db.add(event)
-        
-        else:
-            job.status = "failed"
-            job.output = {"error": f"Unknown job type: {job.job_type}"}
-        
-        db.add(job)
-        db.commit()
-        db.refresh(job)
-        
-        return job.output
-    
+            # eager load already filtered to live events with a body
+            events = sorted(issue.events, key=lambda e: e.created_at)
+            summary = await summarize_thread(str(issue.id), events=events)
+            return await _finish_job(job, batcher, "completed", summary, event_id=event.id)
+
+        return await _finish_job(job, batcher, "failed",
+                                 {"error": f"Unknown job type: {job.job_type}"})
+
     except Exception as e:
-        job.status = "failed"
-        job.output = {"error": str(e)}
-        db.add(job)
-        db.commit()
-        return job.output
-    
-    finally:
-        db.close()
+        return await _finish_job(job, batcher, "failed", {"error": str(e)})
 
 
 async def process_pending_jobs():
-    jobs = get_pending_ai_jobs()
-    
-    for job in jobs:
-        print(f"Processing AI job {job.id} (type: {job.job_type})")
-        result = await process_ai_job(job)
-        print(f"Job {job.id} completed with result: {result}")
+    # Load the jobs with their event/issue graph, then release the connection
+    # before any AI calls start.
+    async with AsyncSessionLocal() as db:
+        jobs = await get_pending_ai_jobs(db)
+        db.expunge_all()
+
+    batcher = JobWriteBatcher()
+    batcher.start()
+    try:
+        sem = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+
+        async def _run(job: AIJob):
+            async with sem:
+                print(f"Processing AI job {job.id} (type: {job.job_type})")
+                result = await process_ai_job(job, batcher=batcher)
+                print(f"Job {job.id} completed with result: {result}")
+                return result
+
+        await asyncio.gather(*[_run(job) for job in jobs], return_exceptions=True)
+    finally:
+        await batcher.close()
 
 
 if __name__ == "__main__":
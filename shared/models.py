@@ -1,41 +1,64 @@
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, TIMESTAMP, Boolean, func, JSON
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, TIMESTAMP, Boolean, func, JSON, Index, text
 from sqlalchemy.dialects.postgresql import UUID as PGUUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy.types import TypeDecorator, CHAR
+from sqlalchemy.types import TypeDecorator, BINARY
 import uuid
 
 class UUID(TypeDecorator):
-    impl = CHAR
+    # 16-byte binary storage off Postgres instead of CHAR(36): PK/FK index
+    # entries shrink by more than half, so more tuples fit per page
+    impl = BINARY
     cache_ok = True
-    
+
     def load_dialect_impl(self, dialect):
         if dialect.name == 'postgresql':
             return dialect.type_descriptor(PGUUID(as_uuid=True))
         else:
-            return dialect.type_descriptor(CHAR(36))
-    
-    def process_bind_param(self, value, dialect):
-        if value is None:
-            return value
-        elif dialect.name == 'postgresql':
-            return value
-        else:
-            return str(value) if isinstance(value, uuid.UUID) else value
-    
-    def process_result_value(self, value, dialect):
-        if value is None:
-            return value
-        elif dialect.name == 'postgresql':
-            return value
-        else:
-            return uuid.UUID(value) if isinstance(value, str) else value
+            return dialect.type_descriptor(BINARY(16))
+
+    # The dialect is fixed once a statement is compiled and SQLAlchemy caches
+    # these processors per column, so specialize here instead of re-checking
+    # dialect.name for every value bound or fetched.
+    def bind_processor(self, dialect):
+        if dialect.name == 'postgresql':
+            return self.load_dialect_impl(dialect).bind_processor(dialect)
+
+        def process(value):
+            if value is None:
+                return None
+            return value.bytes if isinstance(value, uuid.UUID) else uuid.UUID(value).bytes
+        return process
+
+    def result_processor(self, dialect, coltype):
+        if dialect.name == 'postgresql':
+            return self.load_dialect_impl(dialect).result_processor(dialect, coltype)
+
+        def process(value):
+            return value if value is None else uuid.UUID(bytes=value)
+        return process
 
 Base = declarative_base()
 
+def JSONVariant():
+    """JSONB on Postgres (no re-parse on read, GIN-indexable), plain JSON elsewhere."""
+    return JSONB().with_variant(JSON, "sqlite")
+
 
 class Issue(Base):
     __tablename__ = "issues"
+    __table_args__ = (
+        # unique btree point lookup for the per-message thread->issue check;
+        # partial so soft-deleted rows don't block re-creating an issue
+        Index("ix_issues_root_thread", "root_thread_id", unique=True,
+              postgresql_where=text("deleted_at IS NULL"),
+              sqlite_where=text("deleted_at IS NULL")),
+        # the listing endpoints do WHERE deleted_at IS NULL ORDER BY
+        # created_at DESC; partial index serves both filter and sort
+        Index("ix_issues_listing", "created_at",
+              postgresql_where=text("deleted_at IS NULL"),
+              sqlite_where=text("deleted_at IS NULL")),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     program_id = Column(UUID(), ForeignKey("programs.id", ondelete="SET NULL"), nullable=True)
@@ -48,7 +71,8 @@ class Issue(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
     deleted_at = Column(TIMESTAMP(timezone=True), nullable=True)
-    events = relationship("Event", back_populates="issue", cascade="all, delete-orphan")
+    events = relationship("Event", back_populates="issue", cascade="all, delete-orphan",
+                          order_by="Event.created_at")
     participants = relationship("Participant", back_populates="issue", cascade="all, delete-orphan")
     issue_tags = relationship("IssueTag", back_populates="issue", cascade="all, delete-orphan")
     status_changes = relationship("IssueStatusChange", back_populates="issue", cascade="all, delete-orphan")
@@ -58,6 +82,14 @@ class Issue(Base):
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_issue_created", "issue_id", "created_at",
+              postgresql_where=text("deleted_at IS NULL"),
+              sqlite_where=text("deleted_at IS NULL")),
+        # plain fallback index for backends where the partial predicate
+        # doesn't match the query (e.g. SQLite planner quirks)
+        Index("ix_events_issue_id", "issue_id"),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     issue_id = Column(UUID(), ForeignKey("issues.id", ondelete="CASCADE"))
@@ -66,8 +98,8 @@ class Event(Base):
     author = Column(Text)
     body = Column(Text)
     event_type = Column(String(50))
-    ai_metadata = Column(JSON, default={})
-    attachments = Column(JSON, default=[])
+    ai_metadata = Column(JSONVariant(), default=dict, nullable=False)
+    attachments = Column(JSONVariant(), default=list, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     deleted_at = Column(TIMESTAMP(timezone=True), nullable=True)
 
@@ -145,28 +177,82 @@ class OutboundWebhook(Base):
 
 class Program(Base):
     __tablename__ = "programs"
+    __table_args__ = (
+        # program listings filter and sort the same way the issue lists do
+        Index("ix_programs_listing", "created_at",
+              postgresql_where=text("deleted_at IS NULL"),
+              sqlite_where=text("deleted_at IS NULL")),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     program_id = Column(String(255), unique=True, nullable=False)
     name = Column(Text, nullable=False)
     description = Column(Text, nullable=True)
-    owners = Column(JSON, default=[])  # List of owner user_ids
-    channels = Column(JSON, default=[])  # List of associated channel_ids
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
     deleted_at = Column(TIMESTAMP(timezone=True), nullable=True)
 
     issues = relationship("Issue", back_populates="program")
+    owner_links = relationship("ProgramOwner", back_populates="program",
+                               cascade="all, delete-orphan")
+    channel_links = relationship("ProgramChannel", back_populates="program",
+                                 cascade="all, delete-orphan")
+
+    # list-style views over the relation rows, so existing callers keep
+    # reading/assigning plain lists of ids
+    @property
+    def owners(self):
+        return [link.user_id for link in self.owner_links]
+
+    @owners.setter
+    def owners(self, values):
+        self.owner_links = [ProgramOwner(user_id=v) for v in values or []]
+
+    @property
+    def channels(self):
+        return [link.channel_id for link in self.channel_links]
+
+    @channels.setter
+    def channels(self, values):
+        self.channel_links = [ProgramChannel(channel_id=v) for v in values or []]
+
+
+class ProgramOwner(Base):
+    __tablename__ = "program_owners"
+
+    program_id = Column(UUID(), ForeignKey("programs.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(String(255), primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    program = relationship("Program", back_populates="owner_links")
+
+
+class ProgramChannel(Base):
+    __tablename__ = "program_channels"
+    __table_args__ = (
+        Index("ix_program_channels_channel", "channel_id"),
+    )
+
+    program_id = Column(UUID(), ForeignKey("programs.id", ondelete="CASCADE"), primary_key=True)
+    channel_id = Column(String(255), primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    program = relationship("Program", back_populates="channel_links")
 
 
 class AIJob(Base):
     __tablename__ = "ai_jobs"
+    __table_args__ = (
+        Index("ix_ai_jobs_pending", "status",
+              postgresql_where=text("deleted_at IS NULL AND status = 'pending'")),
+    )
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     event_id = Column(UUID(), ForeignKey("events.id", ondelete="CASCADE"))
     job_type = Column(String(50))
     status = Column(String(20), default="pending")
-    output = Column(JSON)
+    # whole-object replaced, never mutated in place, so no Mutable wrapper
+    output = Column(JSONVariant())
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     completed_at = Column(TIMESTAMP(timezone=True))
     deleted_at = Column(TIMESTAMP(timezone=True), nullable=True)
@@ -174,6 +260,18 @@ class AIJob(Base):
     event = relationship("Event", back_populates="ai_jobs")
 
 
+class Ownership(Base):
+    __tablename__ = "ownership"
+    __table_args__ = (
+        Index("ix_ownership_scope", "scope", "scope_id"),
+    )
+
+    scope = Column(String(20), primary_key=True)  # "issue" or "channel"
+    scope_id = Column(String(255), primary_key=True)
+    user_id = Column(String(255), primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+
 class User(Base):
     __tablename__ = "users"
 
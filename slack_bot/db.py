@@ -1,19 +1,63 @@
 import os
 import sys
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from datetime import datetime
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+from cachetools import TTLCache
+from sqlalchemy import create_engine, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, joinedload, raiseload, scoped_session, selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
 from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from shared.models import Base, Issue, Event, Participant, Program
+from shared.models import Base, Issue, Event, Ownership, Participant, Program, ProgramChannel, ProgramOwner
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./test.db")
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine)
+if DATABASE_URL.startswith("sqlite"):
+    # one shared connection instead of reopening the file per call
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+else:
+    # pool_size x uvicorn worker count (plus max_overflow headroom) must
+    # stay under the Postgres max_connections limit
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=20,
+        max_overflow=40,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        future=True
+    )
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+db_session = scoped_session(SessionLocal)
+
+
+def _async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver."""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+else:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=20,
+        pool_pre_ping=True
+    )
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 Base.metadata.create_all(bind=engine)
 
@@ -27,15 +71,84 @@ def get_db() -> Session:
         raise e
 
 
+def get_db_dep():
+    """FastAPI dependency: yield a session closed by the request scope."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def session_scope(db: Optional[Session] = None):
+    """
+    Yield a session, committing and closing it only if this scope created it.
+    Pass an existing session to batch several helpers into one transaction.
+    """
+    if db is not None:
+        yield db
+        return
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def async_session_scope(db: Optional[AsyncSession] = None):
+    """Async counterpart of session_scope for the asyncpg/aiosqlite engine."""
+    if db is not None:
+        yield db
+        return
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+
+# Thread keys ("channel:thread_ts") of live issues, hydrated at import and
+# kept current on create/delete, so handle_message_events can skip the DB for
+# the vast majority of messages that belong to no tracked thread. With
+# multiple workers each process tracks its own set; a key created elsewhere
+# is missed until that worker restarts, so pair this with a periodic refresh
+# (or LISTEN/NOTIFY) if the bot ever runs more than one process.
+TRACKED_THREADS: set = set()
+
+
+def register_thread(key: str):
+    TRACKED_THREADS.add(key)
+
+
+def unregister_thread(key: str):
+    TRACKED_THREADS.discard(key)
+
+
+def _load_tracked_threads():
+    with session_scope() as session:
+        keys = session.scalars(
+            select(Issue.root_thread_id).where(Issue.deleted_at.is_(None))
+        ).all()
+    TRACKED_THREADS.update(key for key in keys if key)
+
+
 def create_issue_from_thread(
     thread_ts: str,
     channel_id: str,
     title: Optional[str] = None,
     description: Optional[str] = None,
-    source: str = "slack"
+    source: str = "slack",
+    db: Optional[Session] = None
 ) -> Issue:
-    db = get_db()
-    try:
+    with session_scope(db) as session:
         issue = Issue(
             title=title or f"Issue from Slack thread {thread_ts}",
             description=description or "",
@@ -44,68 +157,68 @@ def create_issue_from_thread(
             source=source,
             root_thread_id=f"{channel_id}:{thread_ts}"
         )
-        db.add(issue)
-        db.commit()
-        db.refresh(issue)
+        session.add(issue)
+        session.flush()
+        register_thread(issue.root_thread_id)
         return issue
-    finally:
-        db.close()
+
+
+# URL fallback keys in priority order
+FILE_URL_KEYS = ("permalink_public", "permalink", "url_private")
+ATTACHMENT_URL_KEYS = ("permalink", "image_url", "thumb_url")
 
 
 def get_attachment_urls(message: dict) -> list:
-    attachment_urls = []
-    
-    if message.get("files"):
-        for file in message["files"]:
-            if file.get("permalink_public"):
-                attachment_urls.append(file["permalink_public"])
-            elif file.get("permalink"):
-                attachment_urls.append(file["permalink"])
-            elif file.get("url_private"):
-                attachment_urls.append(file["url_private"])
-    
-    if message.get("attachments"):
-        for attachment in message["attachments"]:
-            if attachment.get("permalink"):
-                attachment_urls.append(attachment["permalink"])
-            elif attachment.get("image_url"):
-                attachment_urls.append(attachment["image_url"])
-            elif attachment.get("thumb_url"):
-                attachment_urls.append(attachment["thumb_url"])
-    
-    return attachment_urls
+    # most messages carry no files or attachments; bail on two hash probes
+    if "files" not in message and "attachments" not in message:
+        return []
+    urls = []
+    for items, keys in (
+        (message.get("files"), FILE_URL_KEYS),
+        (message.get("attachments"), ATTACHMENT_URL_KEYS),
+    ):
+        for item in items or ():
+            url = next((item[key] for key in keys if item.get(key)), None)
+            if url:
+                urls.append(url)
+    return urls
 
 
 def save_thread_messages_as_events(
     issue_id: str,
     messages: List[dict],
-    source: str = "slack"
-) -> List[Event]:
-    db = get_db()
-    try:
-        events = []
-        for msg in messages:
-            attachment_urls = get_attachment_urls(msg)
-            
-            event = Event(
-                issue_id=issue_id,
-                source=source,
-                external_id=msg.get("ts"),
-                author=msg.get("user", msg.get("bot_id", "unknown")),
-                body=msg.get("text", ""),
-                event_type="message_added",
-                ai_metadata={},
-                attachments=attachment_urls
-            )
-            db.add(event)
-            events.append(event)
-        
-        db.commit()
-        for event in events:
-            db.refresh(event)
-        return events
-    finally:
-        db.close()
+    source: str = "slack",
+    db: Optional[Session] = None
+) -> tuple:
+    """Persist thread messages; returns (events, unique_user_ids) from one pass."""
+    users = set()
+    payload = []
+    for msg in messages:
+        if msg.get("user"):
+            users.add(msg["user"])
+        payload.append({
+            "issue_id": issue_id,
+            "source": source,
+            "external_id": msg.get("ts"),
+            "author": msg.get("user", msg.get("bot_id", "unknown")),
+            "body": msg.get("text", ""),
+            "event_type": "message_added",
+            "ai_metadata": {},
+            "attachments": get_attachment_urls(msg)
+        })
+
+    if not payload:
+        return [], users
+
+    # single INSERT ... RETURNING (insertmanyvalues) instead of N adds + N
+    # refresh SELECTs; expire_on_commit=False keeps the rows usable after.
+    # callers index into the result by message position (events[0] anchors
+    # the AI job), so pin RETURNING rows to input order
+    with session_scope(db) as session:
+        events = list(session.scalars(
+            insert(Event).returning(Event, sort_by_parameter_order=True), payload
+        ))
+    return events, users
 
 
 def add_participant(
@@ -113,10 +226,10 @@ def add_participant(
     slack_user_id: str,
     name: Optional[str] = None,
     email: Optional[str] = None,
-    role: str = "requester"
+    role: str = "requester",
+    db: Optional[Session] = None
 ) -> Participant:
-    db = get_db()
-    try:
+    with session_scope(db) as session:
         participant = Participant(
             issue_id=issue_id,
             slack_user_id=slack_user_id,
@@ -124,90 +237,177 @@ def add_participant(
             email=email,
             role=role
         )
-        db.add(participant)
-        db.commit()
-        db.refresh(participant)
+        session.add(participant)
+        session.flush()
         return participant
-    finally:
-        db.close()
 
 
-def get_issue_by_thread_id(thread_ts: str, channel_id: str = None) -> Optional[Issue]:
-    db = get_db()
-    try:
-        from sqlalchemy.orm import joinedload
-        
-        if channel_id:
-            # New format: channel:thread_ts
-            query_thread_id = f"{channel_id}:{thread_ts}"
-            issue = db.query(Issue).options(joinedload(Issue.program)).filter(
-                Issue.root_thread_id == query_thread_id,
-                Issue.deleted_at.is_(None)
-            ).first()
-        else:
-            # Try both formats for backward compatibility
-            issue = db.query(Issue).options(joinedload(Issue.program)).filter(
-                (Issue.root_thread_id == thread_ts) | (Issue.root_thread_id.like(f"%:{thread_ts}")),
+def add_participants(
+    issue_id: str,
+    rows: List[tuple],
+    db: Optional[Session] = None
+) -> None:
+    """Bulk-insert (slack_user_id, role) participants in one statement."""
+    if not rows:
+        return
+    with session_scope(db) as session:
+        session.execute(
+            insert(Participant),
+            [
+                {
+                    "issue_id": issue_id,
+                    "slack_user_id": user_id,
+                    "name": None,
+                    "email": None,
+                    "role": role
+                }
+                for user_id, role in rows
+            ]
+        )
+
+
+def insert_event(issue_id: str, msg: dict, source: str = "slack",
+                 db: Optional[Session] = None) -> None:
+    """Insert one thread message as an Event (same payload shape as the bulk path)."""
+    with session_scope(db) as session:
+        session.execute(insert(Event), [{
+            "issue_id": issue_id,
+            "source": source,
+            "external_id": msg.get("ts"),
+            "author": msg.get("user", msg.get("bot_id", "unknown")),
+            "body": msg.get("text", ""),
+            "event_type": "message_added",
+            "ai_metadata": {},
+            "attachments": get_attachment_urls(msg)
+        }])
+
+
+def thread_issue_id(thread_ts: str, channel_id: str, db: Optional[Session] = None) -> Optional[str]:
+    """Return the id of the live issue for a thread, or None. Fetches only the id."""
+    with session_scope(db) as session:
+        return session.scalar(
+            select(Issue.id)
+            .where(
+                Issue.root_thread_id == f"{channel_id}:{thread_ts}",
                 Issue.deleted_at.is_(None)
-            ).first()
+            )
+            .limit(1)
+        )
+
+
+def get_issue_by_thread_id(thread_ts: str, channel_id: str, load_program: bool = False,
+                           db: Optional[Session] = None) -> Optional[Issue]:
+    # root_thread_id is always "channel:thread_ts" now; the old ts-only
+    # LIKE fallback forced a full table scan and is gone (one-shot
+    # migration rewrites any legacy rows to the channel-prefixed form)
+    with session_scope(db) as session:
+        # only join the program row when the caller actually renders it;
+        # raiseload turns any accidental lazy load into a loud error
+        options = (joinedload(Issue.program),) if load_program else (raiseload(Issue.program),)
+        issue = session.query(Issue).options(*options).filter(
+            Issue.root_thread_id == f"{channel_id}:{thread_ts}",
+            Issue.deleted_at.is_(None)
+        ).first()
         return issue
-    finally:
-        db.close()
 
 
-def get_issue_events(issue_id: str) -> List[Event]:
-    db = get_db()
-    try:
-        events = db.query(Event).filter(
+def get_issue_events(issue_id: str, db: Optional[Session] = None) -> List[Event]:
+    with session_scope(db) as session:
+        events = session.query(Event).filter(
             Event.issue_id == issue_id,
             Event.deleted_at.is_(None)
         ).order_by(Event.created_at).all()
         return events
-    finally:
-        db.close()
 
 
-def update_issue_from_ai(issue_id: str, ai_summary: dict) -> Optional[Issue]:
-    db = get_db()
-    try:
-        issue = db.query(Issue).filter(
-            Issue.id == issue_id,
-            Issue.deleted_at.is_(None)
-        ).first()
-        
-        if not issue:
-            return None
-        
-        if ai_summary.get('main_issue'):
-            issue.title = ai_summary['main_issue'][:200]
-        
-        if ai_summary.get('summary'):
-            description_parts = [ai_summary['summary']]
-            
-            if ai_summary.get('key_points'):
-                description_parts.append("\n\nKey Points:")
-                for point in ai_summary['key_points']:
-                    description_parts.append(f"• {point}")
-            
-            if ai_summary.get('action_items'):
-                description_parts.append("\n\nAction Items:")
-                for item in ai_summary['action_items']:
-                    description_parts.append(f"• {item}")
-            
-            issue.description = "\n".join(description_parts) # type: ignore
-        
-        db.add(issue)
-        db.commit()
-        db.refresh(issue)
-        return issue
-    finally:
-        db.close()
+def get_issue_events_with_body(issue_id: str, db: Optional[Session] = None) -> List[Event]:
+    """Like get_issue_events, but skips empty/system messages in SQL."""
+    with session_scope(db) as session:
+        events = session.query(Event).filter(
+            Event.issue_id == issue_id,
+            Event.deleted_at.is_(None),
+            Event.body.isnot(None),
+            Event.body != ""
+        ).order_by(Event.created_at).all()
+        return events
+
+
+def update_issue_from_ai(issue_id: str, ai_summary: dict, db: Optional[Session] = None) -> Optional[str]:
+    """Apply an AI summary to an issue with a single UPDATE; returns the issue id."""
+    values = {}
+
+    if ai_summary.get('main_issue'):
+        values["title"] = ai_summary['main_issue'][:200]
+
+    if ai_summary.get('summary'):
+        key_points = ai_summary.get('key_points')
+        action_items = ai_summary.get('action_items')
+
+        key_block = (
+            "\n\nKey Points:\n" + "\n".join(f"• {point}" for point in key_points)
+            if key_points else ""
+        )
+        action_block = (
+            "\n\nAction Items:\n" + "\n".join(f"• {item}" for item in action_items)
+            if action_items else ""
+        )
+        values["description"] = f"{ai_summary['summary']}{key_block}{action_block}"
+
+    if not values:
+        return issue_id
+
+    with session_scope(db) as session:
+        result = session.execute(
+            update(Issue)
+            .where(Issue.id == issue_id, Issue.deleted_at.is_(None))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return issue_id if result.rowcount else None
+
 
+# Channel->program assignments rarely change, but get_program_by_channel runs
+# on every mention; a short TTL keeps warm lookups off the database entirely.
+_program_cache = TTLCache(maxsize=1024, ttl=300)
+_program_cache_lock = threading.Lock()
 
-def create_program(program_id: str, program_name: str, description: Optional[str] = None) -> Program:
+
+def _insert_ignore(model):
+    """Dialect-appropriate INSERT ... ON CONFLICT DO NOTHING constructor."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model)
+
+
+def _program_to_dict(program: Program) -> dict:
+    return {
+        "id": str(program.id),
+        "program_id": program.program_id,
+        "name": program.name,
+        "owners": list(program.owners or []),
+        "channels": list(program.channels or []),
+    }
+
+
+def _invalidate_program_cache(program_id: Optional[str] = None,
+                              channel_id: Optional[str] = None):
+    with _program_cache_lock:
+        if channel_id is not None:
+            _program_cache.pop(("channel", channel_id), None)
+        if program_id is not None:
+            _program_cache.pop(("program", program_id), None)
+            stale = [key for key, cached in _program_cache.items()
+                     if cached.get("program_id") == program_id]
+            for key in stale:
+                _program_cache.pop(key, None)
+
+
+def create_program(program_id: str, program_name: str, description: Optional[str] = None,
+                   db: Optional[Session] = None) -> Program:
     """Create a new program in the database"""
-    db = get_db()
-    try:
+    with session_scope(db) as session:
         program = Program(
             program_id=program_id,
             name=program_name,
@@ -215,151 +415,234 @@ def create_program(program_id: str, program_name: str, description: Optional[str
             owners=[],
             channels=[]
         )
-        db.add(program)
-        db.commit()
-        db.refresh(program)
-        return program
-    finally:
-        db.close()
-
-
-def get_program(program_id: str) -> Optional[Program]:
-    """Get a program by program_id"""
-    db = get_db()
-    try:
-        program = db.query(Program).filter(
+        session.add(program)
+        session.flush()
+    _invalidate_program_cache(program_id=program_id)
+    return program
+
+
+def get_program(program_id: str, db: Optional[Session] = None) -> Optional[dict]:
+    """Get a program by program_id (cached; returns a plain dict)"""
+    cache_key = ("program", program_id)
+    with _program_cache_lock:
+        cached = _program_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with session_scope(db) as session:
+        program = session.query(Program).options(
+            selectinload(Program.owner_links),
+            selectinload(Program.channel_links)
+        ).filter(
             Program.program_id == program_id,
             Program.deleted_at.is_(None)
         ).first()
-        return program
-    finally:
-        db.close()
+        if not program:
+            return None
+        result = _program_to_dict(program)
+
+    with _program_cache_lock:
+        _program_cache[cache_key] = result
+    return result
+
+
+def get_program_by_channel(channel_id: str, db: Optional[Session] = None) -> Optional[dict]:
+    """Get a program by channel_id (cached; returns a plain dict)"""
+    cache_key = ("channel", channel_id)
+    with _program_cache_lock:
+        cached = _program_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with session_scope(db) as session:
+        # indexed equality join on program_channels instead of scanning
+        # JSON channel lists
+        program = session.query(Program).join(ProgramChannel).options(
+            selectinload(Program.owner_links),
+            selectinload(Program.channel_links)
+        ).filter(
+            ProgramChannel.channel_id == channel_id,
+            Program.deleted_at.is_(None)
+        ).first()
+        if not program:
+            return None
+        result = _program_to_dict(program)
 
+    with _program_cache_lock:
+        _program_cache[cache_key] = result
+    return result
 
-def get_program_by_channel(channel_id: str) -> Optional[Program]:
-    """Get a program by channel_id"""
-    db = get_db()
-    try:
-        from sqlalchemy import and_
-        program = db.query(Program).filter(
-            and_(
-                Program.channels.contains([channel_id]),
+
+def add_channel_to_program(program_id: str, channel_id: str,
+                           db: Optional[Session] = None) -> Optional[str]:
+    """Add a channel to a program; returns the program_id or None"""
+    with session_scope(db) as session:
+        pid = session.scalar(
+            select(Program.id).where(
+                Program.program_id == program_id,
                 Program.deleted_at.is_(None)
             )
-        ).first()
-        return program
-    finally:
-        db.close()
-
-
-def add_channel_to_program(program_id: str, channel_id: str) -> Optional[Program]:
-    """Add a channel to a program"""
-    db = get_db()
-    try:
-        program = db.query(Program).filter(
-            Program.program_id == program_id,
-            Program.deleted_at.is_(None)
-        ).first()
-        
-        if program:
-            if channel_id not in program.channels:
-                program.channels.append(channel_id)
-                db.add(program)
-                db.commit()
-                db.refresh(program)
-        return program
-    finally:
-        db.close()
+        )
+        if pid is None:
+            return None
+        session.execute(
+            _insert_ignore(ProgramChannel)
+            .values(program_id=pid, channel_id=channel_id)
+            .on_conflict_do_nothing()
+        )
+    _invalidate_program_cache(program_id=program_id, channel_id=channel_id)
+    return program_id
 
 
-def add_program_owner(program_id: str, user_id: str) -> Optional[Program]:
-    """Add an owner to a program"""
-    db = get_db()
-    try:
-        program = db.query(Program).filter(
-            Program.program_id == program_id,
-            Program.deleted_at.is_(None)
-        ).first()
-        
-        if program:
-            if user_id not in program.owners:
-                program.owners.append(user_id)
-                db.add(program)
-                db.commit()
-                db.refresh(program)
-        return program
-    finally:
-        db.close()
+def add_program_owner(program_id: str, user_id: str,
+                      db: Optional[Session] = None) -> Optional[str]:
+    """Add an owner to a program; returns the program_id or None"""
+    with session_scope(db) as session:
+        pid = session.scalar(
+            select(Program.id).where(
+                Program.program_id == program_id,
+                Program.deleted_at.is_(None)
+            )
+        )
+        if pid is None:
+            return None
+        session.execute(
+            _insert_ignore(ProgramOwner)
+            .values(program_id=pid, user_id=user_id)
+            .on_conflict_do_nothing()
+        )
+    _invalidate_program_cache(program_id=program_id)
+    return program_id
 
 
-def remove_program_owner(program_id: str, user_id: str) -> Optional[Program]:
-    """Remove an owner from a program"""
-    db = get_db()
-    try:
-        program = db.query(Program).filter(
-            Program.program_id == program_id,
-            Program.deleted_at.is_(None)
-        ).first()
-        
-        if program and user_id in program.owners:
-            program.owners.remove(user_id)
-            db.add(program)
-            db.commit()
-            db.refresh(program)
-        return program
-    finally:
-        db.close()
+def remove_program_owner(program_id: str, user_id: str,
+                         db: Optional[Session] = None) -> Optional[str]:
+    """Remove an owner from a program; returns the program_id"""
+    with session_scope(db) as session:
+        session.query(ProgramOwner).filter(
+            ProgramOwner.user_id == user_id,
+            ProgramOwner.program_id == select(Program.id).where(
+                Program.program_id == program_id
+            ).scalar_subquery()
+        ).delete(synchronize_session=False)
+    _invalidate_program_cache(program_id=program_id)
+    return program_id
 
 
-def get_all_programs() -> List[Program]:
+def get_all_programs(db: Optional[Session] = None) -> List[Program]:
     """Get all programs"""
-    db = get_db()
-    try:
-        programs = db.query(Program).filter(
+    with session_scope(db) as session:
+        programs = session.query(Program).options(
+            selectinload(Program.owner_links),
+            selectinload(Program.channel_links)
+        ).filter(
             Program.deleted_at.is_(None)
         ).all()
         return programs
-    finally:
-        db.close()
 
 
-def link_issue_to_program(issue_id: str, program_id: str) -> Optional[Issue]:
+def link_issue_to_program(issue_id: str, program_id: str,
+                          db: Optional[Session] = None) -> Optional[Issue]:
     """Link an issue to a program"""
-    db = get_db()
-    try:
-        program = db.query(Program).filter(
+    with session_scope(db) as session:
+        program = session.query(Program).filter(
             Program.program_id == program_id,
             Program.deleted_at.is_(None)
         ).first()
-        
+
         if not program:
             return None
-        
-        issue = db.query(Issue).filter(Issue.id == issue_id).first()
+
+        issue = session.query(Issue).filter(Issue.id == issue_id).first()
         if issue:
             issue.program_id = program.id
-            db.add(issue)
-            db.commit()
-            db.refresh(issue)
+            session.flush()
         return issue
-    finally:
-        db.close()
 
 
 # Issue Owner Management
+# Ownership is persisted in the ownership table and mirrored in these
+# in-process sets (write-through), so the permission hot path stays an
+# O(1) membership test while surviving restarts and multiple workers.
+_owners_lock = threading.Lock()
 issue_owners = {}  # Maps issue_id -> set of owner user_ids
+channel_owners = {}  # Maps channel_id -> set of owner user_ids
+
+_OWNER_SCOPES = {"issue": issue_owners, "channel": channel_owners}
+
+
+def _load_ownership():
+    """Hydrate the in-memory owner sets from the ownership table."""
+    with session_scope() as session:
+        rows = session.execute(
+            select(Ownership.scope, Ownership.scope_id, Ownership.user_id)
+        ).all()
+    with _owners_lock:
+        for scope, scope_id, user_id in rows:
+            _OWNER_SCOPES.get(scope, {}).setdefault(scope_id, set()).add(user_id)
+
+
+def _add_owner(scope: str, scope_id: str, user_id: str):
+    with session_scope() as session:
+        session.execute(
+            _insert_ignore(Ownership)
+            .values(scope=scope, scope_id=scope_id, user_id=user_id)
+            .on_conflict_do_nothing()
+        )
+    with _owners_lock:
+        _OWNER_SCOPES[scope].setdefault(scope_id, set()).add(user_id)
+
+
+def _remove_owner(scope: str, scope_id: str, user_id: str):
+    with session_scope() as session:
+        session.query(Ownership).filter(
+            Ownership.scope == scope,
+            Ownership.scope_id == scope_id,
+            Ownership.user_id == user_id
+        ).delete()
+    with _owners_lock:
+        _OWNER_SCOPES[scope].get(scope_id, set()).discard(user_id)
+
+
+def resolve_permission_context(user_id: str, channel_id: Optional[str] = None,
+                               issue_id: Optional[str] = None,
+                               db: Optional[Session] = None) -> bool:
+    """
+    One round trip answering: does user_id own the program behind this
+    channel or behind this issue? Channel/issue ownership itself lives in
+    the in-memory sets, so this is the only DB work a permission check needs.
+    """
+    conditions = []
+    if channel_id:
+        conditions.append(ProgramOwner.program_id.in_(
+            select(ProgramChannel.program_id).where(
+                ProgramChannel.channel_id == channel_id
+            )
+        ))
+    if issue_id:
+        conditions.append(ProgramOwner.program_id.in_(
+            select(Issue.program_id).where(Issue.id == issue_id)
+        ))
+    if not conditions:
+        return False
+
+    with session_scope(db) as session:
+        return session.scalar(
+            select(ProgramOwner.user_id).where(
+                ProgramOwner.user_id == user_id,
+                or_(*conditions)
+            ).limit(1)
+        ) is not None
+
 
 def set_issue_owner(issue_id: str, user_id: str):
     """Set a user as owner of an issue"""
-    if issue_id not in issue_owners:
-        issue_owners[issue_id] = set()
-    issue_owners[issue_id].add(user_id)
+    _add_owner("issue", issue_id, user_id)
 
 
 def remove_issue_owner(issue_id: str, user_id: str):
     """Remove a user as owner of an issue"""
-    if issue_id in issue_owners:
-        issue_owners[issue_id].discard(user_id)
+    _remove_owner("issue", issue_id, user_id)
 
 
 def is_issue_owner(issue_id: str, user_id: str) -> bool:
@@ -367,20 +650,14 @@ def is_issue_owner(issue_id: str, user_id: str) -> bool:
     return user_id in issue_owners.get(issue_id, set())
 
 
-# Channel Owner Management
-channel_owners = {}  # Maps channel_id -> set of owner user_ids
-
 def set_channel_owner(channel_id: str, user_id: str):
     """Set a user as owner of a channel"""
-    if channel_id not in channel_owners:
-        channel_owners[channel_id] = set()
-    channel_owners[channel_id].add(user_id)
+    _add_owner("channel", channel_id, user_id)
 
 
 def remove_channel_owner(channel_id: str, user_id: str):
     """Remove a user as owner of a channel"""
-    if channel_id in channel_owners:
-        channel_owners[channel_id].discard(user_id)
+    _remove_owner("channel", channel_id, user_id)
 
 
 def is_channel_owner(channel_id: str, user_id: str) -> bool:
@@ -388,11 +665,14 @@ def is_channel_owner(channel_id: str, user_id: str) -> bool:
     return user_id in channel_owners.get(channel_id, set())
 
 
+_load_ownership()
+_load_tracked_threads()
+
+
 def get_issue_by_id(issue_id: str) -> Optional[Issue]:
     """Get an issue by its ID"""
     db = get_db()
     try:
-        from sqlalchemy.orm import joinedload
         issue = db.query(Issue).options(joinedload(Issue.program)).filter(Issue.id == issue_id).first()
         return issue
     finally:
@@ -403,8 +683,9 @@ def get_issue_with_program(issue_id: str) -> Optional[dict]:
     """Get issue data with program info - safe to use after session closes"""
     db = get_db()
     try:
-        from sqlalchemy.orm import joinedload
-        issue = db.query(Issue).options(joinedload(Issue.program)).filter(Issue.id == issue_id).first()
+        issue = db.query(Issue).options(
+            joinedload(Issue.program).selectinload(Program.owner_links)
+        ).filter(Issue.id == issue_id).first()
         if not issue:
             return None
         
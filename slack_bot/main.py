@@ -1,15 +1,26 @@
+import logging
+import logging.handlers
 import os
+import queue
 import sys
 import asyncio
 import threading
+# import through the slack_bot package so db/permissions have exactly one
+# module instance shared with permissions.py, ai_handler and web_server —
+# flat imports here would create a second `db` module with its own caches
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
 from dotenv import load_dotenv
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
-from db import (
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_bot.db import (
+    session_scope,
+    insert_event,
     create_issue_from_thread,
     save_thread_messages_as_events,
-    add_participant,
-    get_issue_by_thread_id,
+    add_participants,
+    thread_issue_id,
     update_issue_from_ai,
     create_program as db_create_program,
     get_program,
@@ -25,56 +36,106 @@ from db import (
     remove_issue_owner,
     is_issue_owner,
     is_channel_owner,
-    get_issue_with_program
+    TRACKED_THREADS
 )
 from slack_bolt.request import BoltRequest
-from permissions import Permission, has_permission, get_user_permission, require_permission
+from slack_bot.permissions import Permission, has_permission, get_user_permission, require_permission
 
-sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from ai_handler import create_ai_job, process_ai_job, summarize_thread
 
 load_dotenv()
 
+_log = logging.getLogger(__name__)
+
+
+def _setup_logging():
+    """Route all log records through a queue so handler threads never block on I/O."""
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+    )
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    root = logging.getLogger()
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
 app = App(
     token=os.environ.get("SLACK_BOT_TOKEN"),
     signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
 )
 
+async_client = AsyncWebClient(token=os.environ.get("SLACK_BOT_TOKEN"))
 
-def process_ai_in_background(issue_id: str, logger):
+# One long-lived loop in a daemon thread: no per-event loop setup/teardown,
+# and every AI job shares the httpx connection pool living inside it.
+_BACKGROUND_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_BACKGROUND_LOOP.run_forever, daemon=True, name="background-loop").start()
+
+
+def run_async(coro):
+    """Run a coroutine on the shared background loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _BACKGROUND_LOOP).result()
+
+
+def process_ai_in_background(issue_id: str, logger, channel: str = None,
+                             message_ts: str = None, base_text: str = None):
     """
-    Process AI analysis in a background thread
+    Submit AI summarization to the shared loop; the done-callback applies
+    the result, so the calling handler never blocks on the LLM. When
+    channel/message_ts are given, the original Slack message is edited in
+    place with the AI summary once it lands.
     """
+    future = asyncio.run_coroutine_threadsafe(summarize_thread(issue_id), _BACKGROUND_LOOP)
 
-    try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        summary = loop.run_until_complete(summarize_thread(issue_id))
-        loop.close()
-        
-        if "error" not in summary:
-            updated_issue = update_issue_from_ai(issue_id, summary)
-            if updated_issue:
-                logger.info(f"Issue {issue_id} updated with AI summary")
-        else:
-            logger.warning(f"AI processing error for issue {issue_id}: {summary.get('error')}")
-    
-    except Exception as ai_error:
-        logger.exception(f"Error processing AI job in background: {ai_error}")
+    def _apply(fut):
+        try:
+            summary = fut.result()
+            if "error" not in summary:
+                if update_issue_from_ai(issue_id, summary):
+                    logger.info(f"Issue {issue_id} updated with AI summary")
+                if channel and message_ts:
+                    ai_section = ""
+                    if summary.get("main_issue"):
+                        ai_section += f"\n\n*AI Title:* {summary['main_issue']}"
+                    if summary.get("summary"):
+                        ai_section += f"\n*AI Summary:* {summary['summary']}"
+                    if ai_section:
+                        app.client.chat_update(
+                            channel=channel,
+                            ts=message_ts,
+                            text=f"{base_text or ''}{ai_section}"
+                        )
+            else:
+                logger.warning(f"AI processing error for issue {issue_id}: {summary.get('error')}")
+        except Exception as ai_error:
+            logger.exception(f"Error processing AI job in background: {ai_error}")
+
+    future.add_done_callback(_apply)
+    return future
 
-def get_all_messages(channel_id: str, thread_ts: str, client) -> list[dict]:
+async def get_all_messages(channel_id: str, thread_ts: str, client=None) -> list[dict]:
     """
-    Retrieve all messages from a Slack channel
+    Retrieve all messages from a Slack thread.
+
+    Cursor paging is inherently serial (each page carries the next cursor),
+    but the async client keeps the Bolt worker thread free and reuses one
+    connection across pages; limit=1000 is Slack's max page size.
     """
+    client = client or async_client
     all_messages = []
     cursor = None
 
     while True:
-        response = client.conversations_replies(
+        response = await client.conversations_replies(
             channel=channel_id,
             ts=thread_ts,
             cursor=cursor,
-            limit=999
+            limit=1000
         )
         messages = response.get("messages", [])
         all_messages.extend(messages)
@@ -93,7 +154,7 @@ def handle_app_mention(event, say, logger):
     text = event.get("text", "")
     thread_ts = event.get("thread_ts")
     
-    print(f"App mentioned by user {user}: {text}")
+    logger.info("app_mention user=%s text=%s", user, text)
     
     if thread_ts:
         try:
@@ -109,96 +170,83 @@ def handle_app_mention(event, say, logger):
                 )
                 return
             
-            existing_issue = get_issue_by_thread_id(thread_ts, event["channel"])
-            if existing_issue:
+            existing_issue_id = thread_issue_id(thread_ts, event["channel"])
+            if existing_issue_id:
                 app.client.chat_postMessage(
                     channel=event["channel"],
-                    text=f"⚠️ An issue already exists for this thread (ID: `{existing_issue.id}`)",
+                    text=f"⚠️ An issue already exists for this thread (ID: `{existing_issue_id}`)",
                     thread_ts=thread_ts
                 )
                 return
             
-            all_messages = get_all_messages(event["channel"], thread_ts, app.client)
+            all_messages = run_async(get_all_messages(event["channel"], thread_ts))
             
             first_message = all_messages[0] if all_messages else {}
             title = first_message.get("text", "")[:100] + ("..." if len(first_message.get("text", "")) > 100 else "")
             
-            issue = create_issue_from_thread(
-                thread_ts=thread_ts,
-                channel_id=event["channel"],
-                title=title or "Untitled Issue",
-                description=f"Issue created from Slack thread in channel {event['channel']}"
-            )
-            
+            with session_scope() as db:
+                issue = create_issue_from_thread(
+                    thread_ts=thread_ts,
+                    channel_id=event["channel"],
+                    title=title or "Untitled Issue",
+                    description=f"Issue created from Slack thread in channel {event['channel']}",
+                    db=db
+                )
+
+                events, unique_users = save_thread_messages_as_events(
+                    issue_id=str(issue.id),
+                    messages=all_messages,
+                    db=db
+                )
+
+                participant_rows = [(user, "requester")] + [
+                    (slack_user, "watcher")
+                    for slack_user in unique_users
+                    if slack_user != user
+                ]
+                add_participants(str(issue.id), participant_rows, db=db)
+
             set_issue_owner(str(issue.id), user)
-            
+
             if program:
-                link_issue_to_program(str(issue.id), program.program_id)
+                link_issue_to_program(str(issue.id), program["program_id"])
             
-            events = save_thread_messages_as_events(
-                issue_id=str(issue.id),
-                messages=all_messages
+            user_perm = get_user_permission(user, channel_id=event["channel"], issue_id=str(issue.id))
+
+            # the program dict from get_program_by_channel already has the
+            # name; no need to re-fetch the issue with its program joined
+            program_info = f"*Program:* {program['name']}\n" if program else ""
+
+            success_text = (
+                f"✅ Issue created successfully!\n\n"
+                f"*Issue ID:* `{issue.id}`\n"
+                f"{program_info}"
+                f"*Status:* {issue.status}\n"
+                f"*Messages saved:* {len(events)}\n"
+                f"*Participants:* {len(unique_users)}\n"
+                f"*Your role:* {user_perm.label}"
             )
-            
-            add_participant(
-                issue_id=str(issue.id),
-                slack_user_id=user,
-                role="requester"
+
+            # post the confirmation now; the AI follow-up edits it in place
+            response = app.client.chat_postMessage(
+                channel=event["channel"],
+                text=success_text,
+                thread_ts=thread_ts
             )
-            
-            unique_users = set()
-            for msg in all_messages:
-                if msg.get("user"):
-                    unique_users.add(msg["user"])
-            
-            for slack_user in unique_users:
-                if slack_user != user:
-                    add_participant(
-                        issue_id=str(issue.id),
-                        slack_user_id=slack_user,
-                        role="watcher"
-                    )
-            
+
             if events:
                 ai_job = create_ai_job(
                     event_id=str(events[0].id),
                     job_type="full_extraction"
                 )
-                
-                try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    summary = loop.run_until_complete(summarize_thread(str(issue.id)))
-                    loop.close()
-                    
-                    if "error" not in summary:
-                        updated_issue = update_issue_from_ai(str(issue.id), summary)
-                        if updated_issue:
-                            logger.info(f"Issue {issue.id} updated with AI summary")
-                    
-                except Exception as ai_error:
-                    logger.exception(f"Error processing AI job: {ai_error}")
-            
-            user_perm = get_user_permission(user, channel_id=event["channel"], issue_id=str(issue.id))
-            
-            issue_data = get_issue_with_program(str(issue.id))
-            program_info = ""
-            if issue_data and issue_data.get("program"):
-                program_info = f"*Program:* {issue_data['program']['name']}\n"
-            
-            app.client.chat_postMessage(
-                channel=event["channel"],
-                text=(
-                    f"✅ Issue created successfully!\n\n"
-                    f"*Issue ID:* `{issue.id}`\n"
-                    f"{program_info}"
-                    f"*Status:* {issue.status}\n"
-                    f"*Messages saved:* {len(events)}\n"
-                    f"*Participants:* {len(unique_users)}\n"
-                    f"*Your role:* {user_perm.value}"
-                ),
-                thread_ts=thread_ts
-            )
+
+                process_ai_in_background(
+                    str(issue.id),
+                    logger,
+                    channel=event["channel"],
+                    message_ts=response["ts"],
+                    base_text=success_text
+                )
             
         except Exception as e:
             logger.exception(f"Error creating issue: {e}")
@@ -227,30 +275,18 @@ def handle_message_events(event, logger):
     if not thread_ts:
         return
     
+    # hash probe against the tracked-thread set before any DB work; most
+    # channel messages belong to no issue thread
+    if f"{event.get('channel')}:{thread_ts}" not in TRACKED_THREADS:
+        return
+
     try:
-        existing_issue = get_issue_by_thread_id(thread_ts, event.get("channel"))
-        if not existing_issue:
+        existing_issue_id = thread_issue_id(thread_ts, event.get("channel"))
+        if not existing_issue_id:
             return
         
-        from slack_bot.db import get_db
-        from shared.models import Event
-        
-        db = get_db()
-        try:
-            event_record = Event(
-                issue_id=existing_issue.id,
-                source="slack",
-                external_id=event.get("ts"),
-                author=event.get("user", "unknown"),
-                body=event.get("text", ""),
-                event_type="message_added",
-                ai_metadata={}
-            )
-            db.add(event_record)
-            db.commit()
-            logger.info(f"Added message to issue {existing_issue.id}")
-        finally:
-            db.close()
+        insert_event(existing_issue_id, event)
+        logger.info(f"Added message to issue {existing_issue_id}")
     
     except Exception as e:
         logger.exception(f"Error handling message event: {e}")
@@ -265,13 +301,14 @@ def custom_error_handler(error, body, logger):
 
 
 if __name__ == "__main__":
+    _setup_logging()
     socket_token = os.environ.get("SLACK_APP_TOKEN")
-    
+
     if socket_token:
         handler = SocketModeHandler(app, socket_token)
-        print("Slack bot is running in Socket Mode!")
+        _log.info("Slack bot is running in Socket Mode!")
         handler.start()
     else:
         port = int(os.environ.get("PORT", 3000))
-        print(f"Slack bot is running on port {port}!")
+        _log.info("Slack bot is running on port %s!", port)
         app.start(port=port)
@@ -1,15 +1,53 @@
-from enum import Enum
-from typing import Optional
+import functools
 import os
+import threading
+from enum import IntEnum
+from typing import Optional
+
+from cachetools import TTLCache
+
+# import the module, not names, so nothing here pins db attributes at
+# import time; the per-call function-local import this replaces paid an
+# import-lock dict probe on every permission check
+from slack_bot import db as _db
+
+# IntEnum: the hierarchy IS the value, so has_permission is one int compare
+class Permission(IntEnum):
+    USER = 0                  # Default permission - can view and comment
+    OWNER = 1                 # Owner of a specific issue - can manage their own content
+    PROGRAM_OWNER = 2         # Owner of a program - can manage all issues in their program
+    ADMIN = 3                 # Admin over everything - full control
+
+    @property
+    def label(self) -> str:
+        """Human-readable name used in Slack messages."""
+        return _LABELS[self]
 
-class Permission(Enum):
-    USER = "user"                  # Default permission - can view and comment
-    OWNER = "owner"                # Owner of a specific issue - can manage their own content
-    PROGRAM_OWNER = "program_owner" # Owner of a program - can manage all issues in their program
-    ADMIN = "admin"                # Admin over everything - full control
 
+_LABELS = {
+    Permission.USER: "user",
+    Permission.OWNER: "owner",
+    Permission.PROGRAM_OWNER: "program_owner",
+    Permission.ADMIN: "admin",
+}
 
-ADMIN_USERS = set(os.environ.get("SLACK_ADMIN_USERS", "").split(","))
+
+ADMIN_USERS = frozenset(
+    u.strip() for u in os.environ.get("SLACK_ADMIN_USERS", "").split(",") if u.strip()
+)
+
+# burst events in a channel re-check the same (user, channel, issue) tuple
+# within seconds; 30s of staleness is acceptable for RBAC here
+_perm_cache = TTLCache(maxsize=10_000, ttl=30)
+_perm_cache_lock = threading.Lock()
+
+
+def invalidate_cache(program_id: Optional[str] = None):
+    """Drop cached permission decisions (e.g. after program changes)."""
+    # cache keys don't record which program produced a decision, so any
+    # program change clears everything — entries rebuild within one TTL
+    with _perm_cache_lock:
+        _perm_cache.clear()
 
 
 def get_user_permission(user_id: str, channel_id: Optional[str] = None, issue_id: Optional[str] = None) -> Permission:
@@ -17,30 +55,42 @@ def get_user_permission(user_id: str, channel_id: Optional[str] = None, issue_id
     Get the effective permission level for a user.
     Checks in order: admin -> program_owner -> issue_owner -> user (default)
     """
-    from slack_bot.db import get_issue_with_program, get_program_by_channel, is_channel_owner, is_issue_owner
-    
+    # admins short-circuit before the cache and any DB work
     if user_id in ADMIN_USERS:
         return Permission.ADMIN
-    
+
+    cache_key = (user_id, channel_id, issue_id)
+    with _perm_cache_lock:
+        cached = _perm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    permission = _compute_user_permission(user_id, channel_id, issue_id)
+    with _perm_cache_lock:
+        _perm_cache[cache_key] = permission
+    return permission
+
+
+def _compute_user_permission(user_id: str, channel_id: Optional[str], issue_id: Optional[str]) -> Permission:
+    # resolve the channel's program first via the TTL-cached lookup the
+    # message handlers already use — a cache hit answers PROGRAM_OWNER
+    # with no DB work at all
     if channel_id:
-        program = get_program_by_channel(channel_id)
-        if program and user_id in program.owners:
+        program = _db.get_program_by_channel(channel_id)
+        if program and user_id in program["owners"]:
             return Permission.PROGRAM_OWNER
-    
-    if issue_id:
-        try:
-            issue_data = get_issue_with_program(issue_id)
-            if issue_data and issue_data.get("program") and user_id in issue_data["program"].get("owners", []):
-                return Permission.PROGRAM_OWNER
-        except:
-            pass
-    
-    if channel_id and is_channel_owner(channel_id, user_id):
+
+    # the issue may be linked to a different program than the channel;
+    # the channel branch is already resolved, so query the issue side only
+    if issue_id and _db.resolve_permission_context(user_id, issue_id=issue_id):
+        return Permission.PROGRAM_OWNER
+
+    if channel_id and _db.is_channel_owner(channel_id, user_id):
         return Permission.OWNER
-    
-    if issue_id and is_issue_owner(issue_id, user_id):
+
+    if issue_id and _db.is_issue_owner(issue_id, user_id):
         return Permission.OWNER
-    
+
     return Permission.USER
 
 
@@ -51,15 +101,11 @@ def has_permission(user_id: str, required_permission: Permission,
     Permission hierarchy: ADMIN > PROGRAM_OWNER > OWNER > USER
     """
     user_perm = get_user_permission(user_id, channel_id, issue_id)
-    
-    permission_hierarchy = {
-        Permission.USER: 0,
-        Permission.OWNER: 1,
-        Permission.PROGRAM_OWNER: 2,
-        Permission.ADMIN: 3
-    }
-    
-    return permission_hierarchy[user_perm] >= permission_hierarchy[required_permission]
+    return user_perm >= required_permission
+
+
+def _noop_say(**kwargs):
+    return None
 
 
 def require_permission(required_permission: Permission):
@@ -67,18 +113,20 @@ def require_permission(required_permission: Permission):
     Decorator to require a specific permission level for an action
     """
     def decorator(func):
+        # resolved once at decoration time instead of per event
+        denial_text = f"❌ You need {required_permission.label} permission to perform this action."
+
+        @functools.wraps(func)
         def wrapper(event, *args, **kwargs):
-            user_id = event.get("user")
-            channel_id = event.get("channel")
-            
-            if not has_permission(user_id, required_permission, channel_id=channel_id):
-                perm_name = required_permission.value
-                kwargs.get('say', lambda **k: None)(
-                    text=f"❌ You need {perm_name} permission to perform this action.",
-                    thread_ts=event.get("thread_ts") or event.get("ts")
+            event_get = event.get
+
+            if not has_permission(event_get("user"), required_permission, channel_id=event_get("channel")):
+                kwargs.get('say', _noop_say)(
+                    text=denial_text,
+                    thread_ts=event_get("thread_ts") or event_get("ts")
                 )
                 return
-            
+
             return func(event, *args, **kwargs)
         return wrapper
     return decorator
@@ -1,22 +1,49 @@
-from fastapi import FastAPI, Request, HTTPException, Depends, status, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi import BackgroundTasks, FastAPI, Request, Response, HTTPException, Depends, status, Form
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session, selectinload
 from typing import Optional, List
+import hashlib
+import logging
+import logging.handlers
 import os
+import queue
 import uuid
+from functools import lru_cache
 from datetime import datetime
 from dotenv import load_dotenv
+from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 load_dotenv()
 
 from shared.models import Issue, Program, Event
-from slack_bot.db import get_db
-from slack_bot.permissions import Permission, has_permission, ADMIN_USERS
+from slack_bot.db import get_db_dep
+from slack_bot.permissions import Permission, has_permission, ADMIN_USERS, invalidate_cache
 
-app = FastAPI(title="Issue Management System")
+logger = logging.getLogger(__name__)
+
+
+def _setup_logging():
+    """Route all log records through a queue so request threads never block on I/O."""
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+    )
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    root = logging.getLogger()
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+app = FastAPI(title="Issue Management System", default_response_class=ORJSONResponse)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="templates/static"), name="static")
@@ -24,6 +51,10 @@ app.mount("/static", StaticFiles(directory="templates/static"), name="static")
 # Session middleware
 app.add_middleware(SessionMiddleware, secret_key=os.environ.get("SESSION_SECRET_KEY", "your-secret-key-change-this"))
 
+# compress large JSON payloads (event bodies are text-heavy); small
+# responses skip compression entirely
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Simple auth credentials from environment
 AUTH_USERNAME = os.environ.get("WEB_USERNAME", "admin")
 AUTH_PASSWORD = os.environ.get("WEB_PASSWORD", "password")
@@ -32,6 +63,25 @@ AUTH_PASSWORD = os.environ.get("WEB_PASSWORD", "password")
 templates = Jinja2Templates(directory="templates")
 
 
+class StatusUpdate(BaseModel):
+    status: str
+
+
+class PriorityUpdate(BaseModel):
+    priority: str
+
+
+@lru_cache()
+def _get_slack_app():
+    """Shared slack_bolt App so the WebClient's connection pool is reused."""
+    from slack_bolt import App
+
+    return App(
+        token=os.environ.get("SLACK_BOT_TOKEN"),
+        signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
+    )
+
+
 # Dependency to get current user from session
 def get_current_user(request: Request):
     user = request.session.get('user')
@@ -92,178 +142,181 @@ async def logout(request: Request):
 
 
 @app.get("/issues", response_class=HTMLResponse)
-async def list_issues(request: Request, user: dict = Depends(get_current_user)):
+async def list_issues(request: Request, user: dict = Depends(get_current_user), db: Session = Depends(get_db_dep)):
     """List all issues"""
-    db = get_db()
-    try:
-        issues = db.query(Issue).filter(Issue.deleted_at == None).order_by(Issue.created_at.desc()).all()
-        return templates.TemplateResponse("issues.html", {
-            "request": request,
-            "issues": issues,
-            "user": user
-        })
-    finally:
-        db.close()
-
-
-@app.get("/api/issues", response_class=JSONResponse)
-async def get_issues_api(user: dict = Depends(get_current_user)):
+    issues = db.query(Issue).options(
+        selectinload(Issue.program)
+    ).filter(Issue.deleted_at.is_(None)).order_by(Issue.created_at.desc()).all()
+    return templates.TemplateResponse("issues.html", {
+        "request": request,
+        "issues": issues,
+        "user": user
+    })
+
+
+@app.get("/api/issues")
+async def get_issues_api(request: Request, response: Response, user: dict = Depends(get_current_user), db: Session = Depends(get_db_dep)):
     """Get all issues as JSON"""
-    db = get_db()
-    try:
-        issues = db.query(Issue).filter(Issue.deleted_at == None).order_by(Issue.created_at.desc()).all()
-        return [{
-            "id": str(issue.id),
-            "title": issue.title,
-            "description": issue.description,
-            "status": issue.status,
-            "priority": issue.priority,
-            "source": issue.source,
-            "program_id": str(issue.program_id) if issue.program_id else None,
-            "created_at": issue.created_at.isoformat() if issue.created_at else None,
-            "updated_at": issue.updated_at.isoformat() if issue.updated_at else None
-        } for issue in issues]
-    finally:
-        db.close()
-
-
-@app.get("/api/issues/{issue_id}", response_class=JSONResponse)
-async def get_issue_detail(issue_id: str, user: dict = Depends(get_current_user)):
+    # the UI polls this endpoint; MAX(updated_at) is a cheap validator, so
+    # unchanged polls cost one aggregate query and a 304
+    max_updated = db.query(func.max(Issue.updated_at)).filter(Issue.deleted_at.is_(None)).scalar()
+    etag = hashlib.md5(str(max_updated).encode()).hexdigest()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+    response.headers["ETag"] = etag
+
+    # column select: no ORM identity-map bookkeeping, and rows stream out
+    # of the cursor in chunks instead of materializing entities first
+    rows = db.query(
+        Issue.id, Issue.title, Issue.description, Issue.status, Issue.priority,
+        Issue.source, Issue.program_id, Issue.created_at, Issue.updated_at
+    ).filter(Issue.deleted_at.is_(None)).order_by(Issue.created_at.desc()).yield_per(500)
+    return [{
+        "id": str(row.id),
+        "title": row.title,
+        "description": row.description,
+        "status": row.status,
+        "priority": row.priority,
+        "source": row.source,
+        "program_id": str(row.program_id) if row.program_id else None,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None
+    } for row in rows]
+
+
+@app.get("/api/issues/{issue_id}")
+async def get_issue_detail(issue_id: str, user: dict = Depends(get_current_user), db: Session = Depends(get_db_dep)):
     """Get issue detail with first 20 events"""
-    db = get_db()
-    try:
-        issue = db.query(Issue).filter(Issue.id == issue_id, Issue.deleted_at == None).first()
-        if not issue:
-            raise HTTPException(status_code=404, detail="Issue not found")
-        
-        # Get total count of events
-        total_events = db.query(Event).filter(Event.issue_id == issue_id, Event.deleted_at == None).count()
-        
-        # Get only first 20 events
-        events = db.query(Event).filter(Event.issue_id == issue_id, Event.deleted_at == None).order_by(Event.created_at).limit(20).all()
-        
-        # Build events
-        events_data = []
-        for event in events:
-            events_data.append({
-                "id": str(event.id),
-                "author": event.author,
-                "body": event.body,
-                "event_type": event.event_type,
-                "created_at": event.created_at.isoformat() if event.created_at else None
-            })
-        
-        return {
-            "id": str(issue.id),
-            "title": issue.title,
-            "description": issue.description,
-            "status": issue.status,
-            "priority": issue.priority,
-            "source": issue.source,
-            "program_id": str(issue.program_id) if issue.program_id else None,
-            "created_at": issue.created_at.isoformat() if issue.created_at else None,
-            "updated_at": issue.updated_at.isoformat() if issue.updated_at else None,
-            "events": events_data,
-            "total_events": total_events
-        }
-    finally:
-        db.close()
+    issue = db.query(Issue).options(
+        selectinload(Issue.program)
+    ).filter(Issue.id == issue_id, Issue.deleted_at.is_(None)).first()
+    if not issue:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    
+    # one query: page of event columns plus COUNT(*) OVER () as an extra
+    # column — plain Row tuples, no ORM hydration or identity map
+    rows = db.query(
+        Event.id, Event.author, Event.body, Event.event_type, Event.created_at,
+        func.count().over().label('total')
+    ).filter(Event.issue_id == issue_id, Event.deleted_at.is_(None)).order_by(Event.created_at).limit(20).all()
+    total_events = rows[0].total if rows else 0
+
+    # Build events
+    events_data = [{
+        "id": str(row.id),
+        "author": row.author,
+        "body": row.body,
+        "event_type": row.event_type,
+        "created_at": row.created_at.isoformat() if row.created_at else None
+    } for row in rows]
 
+    return {
+        "id": str(issue.id),
+        "title": issue.title,
+        "description": issue.description,
+        "status": issue.status,
+        "priority": issue.priority,
+        "source": issue.source,
+        "program_id": str(issue.program_id) if issue.program_id else None,
+        "created_at": issue.created_at.isoformat() if issue.created_at else None,
+        "updated_at": issue.updated_at.isoformat() if issue.updated_at else None,
+        "events": events_data,
+        "total_events": total_events
+    }
 
-@app.get("/api/issues/{issue_id}/messages", response_class=JSONResponse)
-async def get_issue_messages(issue_id: str, offset: int = 0, limit: int = 20, user: dict = Depends(get_current_user)):
+
+@app.get("/api/issues/{issue_id}/messages")
+async def get_issue_messages(issue_id: str, offset: int = 0, limit: int = 20, user: dict = Depends(get_current_user), db: Session = Depends(get_db_dep)):
     """Get paginated messages for an issue"""
-    db = get_db()
-    try:
-        # Verify issue exists
-        issue = db.query(Issue).filter(Issue.id == issue_id, Issue.deleted_at == None).first()
-        if not issue:
-            raise HTTPException(status_code=404, detail="Issue not found")
-        
-        # Get total count
-        total_events = db.query(Event).filter(Event.issue_id == issue_id, Event.deleted_at == None).count()
-        
-        # Get paginated events
-        events = db.query(Event).filter(Event.issue_id == issue_id, Event.deleted_at == None).order_by(Event.created_at).offset(offset).limit(limit).all()
-        
-        # Build events
-        events_data = []
-        for event in events:
-            events_data.append({
-                "id": str(event.id),
-                "author": event.author,
-                "body": event.body,
-                "event_type": event.event_type,
-                "created_at": event.created_at.isoformat() if event.created_at else None
-            })
-        
-        return {
-            "events": events_data,
-            "total_events": total_events,
-            "offset": offset,
-            "limit": limit,
-            "returned": len(events_data)
-        }
-    finally:
-        db.close()
+    # Verify issue exists (id-only probe, no entity load)
+    exists = db.query(Issue.id).filter(Issue.id == issue_id, Issue.deleted_at.is_(None)).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Issue not found")
+
+    # one query: page of event columns plus COUNT(*) OVER () as an extra
+    # column — plain Row tuples, no ORM hydration or identity map
+    rows = db.query(
+        Event.id, Event.author, Event.body, Event.event_type, Event.created_at,
+        func.count().over().label('total')
+    ).filter(Event.issue_id == issue_id, Event.deleted_at.is_(None)).order_by(Event.created_at).offset(offset).limit(limit).all()
+    total_events = rows[0].total if rows else 0
+
+    # Build events
+    events_data = [{
+        "id": str(row.id),
+        "author": row.author,
+        "body": row.body,
+        "event_type": row.event_type,
+        "created_at": row.created_at.isoformat() if row.created_at else None
+    } for row in rows]
 
+    return {
+        "events": events_data,
+        "total_events": total_events,
+        "offset": offset,
+        "limit": limit,
+        "returned": len(events_data)
+    }
+
+
+def _post_slack_status_change(root_thread_id: str, old_status: str, new_status: str, user_id: str):
+    """Post a status-change notification to the issue's Slack thread."""
+    try:
+        # Extract channel and thread timestamp
+        if ':' in root_thread_id:
+            parts = root_thread_id.split(':')
+            if len(parts) == 2:
+                channel = parts[0]
+                thread_ts = parts[1]
+
+                message = f"Status changed from *{old_status}* to *{new_status}* by {user_id}"
+                result = _get_slack_app().client.chat_postMessage(
+                    channel=channel,
+                    thread_ts=thread_ts,
+                    text=message
+                )
+                logger.info("Message posted to Slack: %s", result)
+            else:
+                logger.warning("Invalid root_thread_id format (multiple colons): %s", root_thread_id)
+        else:
+            logger.warning("Old format root_thread_id detected (no channel info): %s. Cannot post to Slack.", root_thread_id)
+    except Exception:
+        logger.exception("Error posting to Slack")
 
 
-@app.patch("/api/issues/{issue_id}/status", response_class=JSONResponse)
-async def update_issue_status(issue_id: str, request: Request, user: dict = Depends(get_current_user)):
+@app.patch("/api/issues/{issue_id}/status")
+async def update_issue_status(issue_id: str, payload: StatusUpdate, background: BackgroundTasks, user: dict = Depends(get_current_user), db: Session = Depends(get_db_dep)):
     """Update issue status and send message to Slack thread"""
-    db = get_db()
     try:
-        issue = db.query(Issue).filter(Issue.id == issue_id, Issue.deleted_at == None).first()
-        if not issue:
+        new_status = payload.status
+
+        # small column fetch for the Slack notification, then one UPDATE —
+        # no ORM entity load or attribute-change tracking in between
+        row = db.query(Issue.status, Issue.root_thread_id).filter(
+            Issue.id == issue_id, Issue.deleted_at.is_(None)
+        ).first()
+        if not row:
             raise HTTPException(status_code=404, detail="Issue not found")
-        
-        body = await request.json()
-        new_status = body.get('status')
-        
-        if not new_status:
-            raise HTTPException(status_code=400, detail="Status is required")
-        
-        old_status = issue.status
-        issue.status = new_status
+        old_status, root_thread_id = row
+
+        db.execute(
+            update(Issue)
+            .where(Issue.id == issue_id, Issue.deleted_at.is_(None))
+            .values(status=new_status)
+        )
         db.commit()
-        
-        # Send message to Slack thread
-        if issue.root_thread_id:
-            try:
-                from slack_bolt import App
-                
-                slack_app = App(
-                    token=os.environ.get("SLACK_BOT_TOKEN"),
-                    signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
-                )
-                
-                # Extract channel and thread timestamp
-                if ':' in issue.root_thread_id:
-                    parts = issue.root_thread_id.split(':')
-                    if len(parts) == 2:
-                        channel = parts[0]
-                        thread_ts = parts[1]
-                        
-                        message = f"Status changed from *{old_status}* to *{new_status}* by {user.get('id', 'unknown')}"
-                        result = slack_app.client.chat_postMessage(
-                            channel=channel,
-                            thread_ts=thread_ts,
-                            text=message
-                        )
-                        print(f"Message posted to Slack: {result}")
-                    else:
-                        print(f"Invalid root_thread_id format (multiple colons): {issue.root_thread_id}")
-                else:
-                    print(f"Old format root_thread_id detected (no channel info): {issue.root_thread_id}. Cannot post to Slack.")
-            except Exception as e:
-                print(f"Error posting to Slack: {e}")
-                import traceback
-                traceback.print_exc()
-        
+
+        # Slack notification runs after the response is sent; Slack API
+        # slowness can no longer hold the request (or its DB session) open
+        if root_thread_id:
+            background.add_task(
+                _post_slack_status_change,
+                root_thread_id, old_status, new_status, user.get('id', 'unknown')
+            )
+
         return {
-            "id": str(issue.id),
-            "status": issue.status,
+            "id": issue_id,
+            "status": new_status,
             "message": f"Status updated from {old_status} to {new_status}"
         }
     except HTTPException:
@@ -271,31 +324,29 @@ async def update_issue_status(issue_id: str, request: Request, user: dict = Depe
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
-@app.patch("/api/issues/{issue_id}/priority", response_class=JSONResponse)
-async def update_issue_priority(issue_id: str, request: Request, user: dict = Depends(get_current_user)):
+@app.patch("/api/issues/{issue_id}/priority")
+async def update_issue_priority(issue_id: str, payload: PriorityUpdate, user: dict = Depends(get_current_user), db: Session = Depends(get_db_dep)):
     """Update issue priority"""
-    db = get_db()
     try:
-        issue = db.query(Issue).filter(Issue.id == issue_id, Issue.deleted_at == None).first()
-        if not issue:
+        new_priority = payload.priority
+
+        # single round trip: UPDATE ... RETURNING, no entity load
+        row = db.execute(
+            update(Issue)
+            .where(Issue.id == issue_id, Issue.deleted_at.is_(None))
+            .values(priority=new_priority)
+            .returning(Issue.id, Issue.priority)
+        ).first()
+        if row is None:
+            db.rollback()
             raise HTTPException(status_code=404, detail="Issue not found")
-        
-        body = await request.json()
-        new_priority = body.get('priority')
-        
-        if not new_priority:
-            raise HTTPException(status_code=400, detail="Priority is required")
-        
-        issue.priority = new_priority
         db.commit()
-        
+
         return {
-            "id": str(issue.id),
-            "priority": issue.priority,
+            "id": str(row.id),
+            "priority": row.priority,
             "message": "Priority updated successfully"
         }
     except HTTPException:
@@ -303,48 +354,46 @@ async def update_issue_priority(issue_id: str, request: Request, user: dict = De
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+
 
 @app.get("/programs", response_class=HTMLResponse)
-async def list_programs(request: Request, user: dict = Depends(get_current_user)):
+async def list_programs(request: Request, user: dict = Depends(get_current_user), db: Session = Depends(get_db_dep)):
     """List all programs"""
-    db = get_db()
-    try:
-        programs = db.query(Program).filter(Program.deleted_at == None).order_by(Program.created_at.desc()).all()
-        return templates.TemplateResponse("programs.html", {
-            "request": request,
-            "programs": programs,
-            "user": user
-        })
-    finally:
-        db.close()
-
-
-@app.get("/api/programs", response_class=JSONResponse)
-async def get_programs_api(user: dict = Depends(get_current_user)):
+    programs = db.query(Program).options(
+        selectinload(Program.owner_links),
+        selectinload(Program.channel_links)
+    ).filter(Program.deleted_at.is_(None)).order_by(Program.created_at.desc()).all()
+    return templates.TemplateResponse("programs.html", {
+        "request": request,
+        "programs": programs,
+        "user": user
+    })
+
+
+@app.get("/api/programs")
+async def get_programs_api(user: dict = Depends(get_current_user), db: Session = Depends(get_db_dep)):
     """Get all programs as JSON"""
-    db = get_db()
-    try:
-        programs = db.query(Program).filter(Program.deleted_at == None).order_by(Program.created_at.desc()).all()
-        return [{
-            "id": str(program.id),
-            "program_id": program.program_id,
-            "name": program.name,
-            "description": program.description,
-            "owners": program.owners,
-            "channels": program.channels,
-            "created_at": program.created_at.isoformat() if program.created_at else None,
-            "updated_at": program.updated_at.isoformat() if program.updated_at else None
-        } for program in programs]
-    finally:
-        db.close()
-
-
-@app.post("/api/programs", response_class=JSONResponse)
+    programs = db.query(Program).options(
+        selectinload(Program.owner_links),
+        selectinload(Program.channel_links)
+    ).filter(Program.deleted_at.is_(None)).order_by(Program.created_at.desc()).all()
+    return [{
+        "id": str(program.id),
+        "program_id": program.program_id,
+        "name": program.name,
+        "description": program.description,
+        "owners": program.owners,
+        "channels": program.channels,
+        "created_at": program.created_at.isoformat() if program.created_at else None,
+        "updated_at": program.updated_at.isoformat() if program.updated_at else None
+    } for program in programs]
+
+
+@app.post("/api/programs")
 async def create_program(
     request: Request,
-    user: dict = Depends(require_admin)
+    user: dict = Depends(require_admin),
+    db: Session = Depends(get_db_dep)
 ):
     """Create a new program (admin only)"""
     data = await request.json()
@@ -353,103 +402,101 @@ async def create_program(
     if not data.get('program_id') or not data.get('name'):
         raise HTTPException(status_code=400, detail="program_id and name are required")
     
-    db = get_db()
-    try:
-        # Check if program_id already exists
-        existing = db.query(Program).filter(Program.program_id == data['program_id'], Program.deleted_at == None).first()
-        if existing:
-            raise HTTPException(status_code=400, detail="Program ID already exists")
-        
-        program = Program(
-            program_id=data['program_id'],
-            name=data['name'],
-            description=data.get('description', ''),
-            owners=data.get('owners', []),
-            channels=data.get('channels', [])
-        )
-        db.add(program)
-        db.commit()
-        db.refresh(program)
-        
-        return {
-            "id": str(program.id),
-            "program_id": program.program_id,
-            "name": program.name,
-            "description": program.description,
-            "owners": program.owners,
-            "channels": program.channels,
-            "created_at": program.created_at.isoformat() if program.created_at else None
-        }
-    finally:
-        db.close()
+    # Check if program_id already exists
+    existing = db.query(Program).filter(Program.program_id == data['program_id'], Program.deleted_at.is_(None)).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Program ID already exists")
+    
+    program = Program(
+        program_id=data['program_id'],
+        name=data['name'],
+        description=data.get('description', ''),
+        owners=data.get('owners', []),
+        channels=data.get('channels', [])
+    )
+    db.add(program)
+    db.commit()
+    db.refresh(program)
+    invalidate_cache(str(program.id))
+    
+    return {
+        "id": str(program.id),
+        "program_id": program.program_id,
+        "name": program.name,
+        "description": program.description,
+        "owners": program.owners,
+        "channels": program.channels,
+        "created_at": program.created_at.isoformat() if program.created_at else None
+    }
 
 
-@app.put("/api/programs/{program_id}", response_class=JSONResponse)
+@app.put("/api/programs/{program_id}")
 async def update_program(
     program_id: str,
     request: Request,
-    user: dict = Depends(require_admin)
+    user: dict = Depends(require_admin),
+    db: Session = Depends(get_db_dep)
 ):
     """Update a program (admin only)"""
     data = await request.json()
     
-    db = get_db()
-    try:
-        program = db.query(Program).filter(Program.id == program_id, Program.deleted_at == None).first()
-        if not program:
-            raise HTTPException(status_code=404, detail="Program not found")
-        
-        # Update fields
-        if 'name' in data:
-            program.name = data['name']
-        if 'description' in data:
-            program.description = data['description']
-        if 'owners' in data:
-            program.owners = data['owners']
-        if 'channels' in data:
-            program.channels = data['channels']
-        
-        program.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(program)
-        
-        return {
-            "id": str(program.id),
-            "program_id": program.program_id,
-            "name": program.name,
-            "description": program.description,
-            "owners": program.owners,
-            "channels": program.channels,
-            "updated_at": program.updated_at.isoformat()
-        }
-    finally:
-        db.close()
+    program = db.query(Program).filter(Program.id == program_id, Program.deleted_at.is_(None)).first()
+    if not program:
+        raise HTTPException(status_code=404, detail="Program not found")
+    
+    # Update fields
+    if 'name' in data:
+        program.name = data['name']
+    if 'description' in data:
+        program.description = data['description']
+    if 'owners' in data:
+        program.owners = data['owners']
+    if 'channels' in data:
+        program.channels = data['channels']
+    
+    program.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(program)
+    invalidate_cache(str(program.id))
+    
+    return {
+        "id": str(program.id),
+        "program_id": program.program_id,
+        "name": program.name,
+        "description": program.description,
+        "owners": program.owners,
+        "channels": program.channels,
+        "updated_at": program.updated_at.isoformat()
+    }
 
 
-@app.delete("/api/programs/{program_id}", response_class=JSONResponse)
+@app.delete("/api/programs/{program_id}")
 async def delete_program(
     program_id: str,
-    user: dict = Depends(require_admin)
+    user: dict = Depends(require_admin),
+    db: Session = Depends(get_db_dep)
 ):
     """Delete a program (admin only)"""
-    db = get_db()
-    try:
-        program = db.query(Program).filter(Program.id == program_id, Program.deleted_at == None).first()
-        if not program:
-            raise HTTPException(status_code=404, detail="Program not found")
-        
-        program.deleted_at = datetime.utcnow()
-        db.commit()
-        
-        return {"message": "Program deleted successfully"}
-    finally:
-        db.close()
+    program = db.query(Program).filter(Program.id == program_id, Program.deleted_at.is_(None)).first()
+    if not program:
+        raise HTTPException(status_code=404, detail="Program not found")
+    
+    program.deleted_at = datetime.utcnow()
+    db.commit()
+    invalidate_cache(str(program.id))
+    
+    return {"message": "Program deleted successfully"}
 
 
-@app.get("/api/me", response_class=JSONResponse)
-async def get_current_user_info(user: dict = Depends(get_current_user)):
+@app.get("/api/me")
+async def get_current_user_info(request: Request, response: Response, user: dict = Depends(get_current_user)):
     """Get current user info"""
     is_admin = user.get('id') == AUTH_USERNAME
+    # session-derived and stable per login; validator is the payload itself
+    etag = hashlib.md5(repr(sorted(user.items())).encode() + str(is_admin).encode()).hexdigest()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+    response.headers["ETag"] = etag
     return {
         **user,
         "is_admin": is_admin
@@ -458,4 +505,5 @@ async def get_current_user_info(user: dict = Depends(get_current_user)):
 
 if __name__ == "__main__":
     import uvicorn
+    _setup_logging()
     uvicorn.run(app, host="0.0.0.0", port=8000)